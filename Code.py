@@ -1,12 +1,29 @@
+import numpy as np
 import pandas as pd
-from sklearn.preprocessing import LabelEncoder
 from sklearn.model_selection import train_test_split
+from openpyxl import load_workbook
 
-# Load the dataset
-df = pd.read_excel(
-    'healthcare_dataset.xlsx',
-    engine='openpyxl'
-)
+def read_xlsx_streaming(path):
+    # openpyxl read-only mode streams rows instead of building a Cell object per value
+    wb = load_workbook(path, read_only=True, data_only=True)
+    try:
+        rows = wb.active.iter_rows(values_only=True)
+        header = next(rows)
+        return pd.DataFrame(list(rows), columns=header)
+    finally:
+        wb.close()
+
+# Load the dataset (calamine is a Rust xlsx reader: much faster and lighter than openpyxl)
+# Pin the known text columns to str so pandas skips per-cell type inference on them
+try:
+    df = pd.read_excel(
+        'healthcare_dataset.xlsx',
+        engine='calamine',
+        dtype={'Gender': str, 'Test Results': str, 'Medical Condition': str}
+    )
+except (ImportError, ValueError):
+    # python-calamine missing (or pandas < 2.2): fall back to openpyxl's streaming reader
+    df = read_xlsx_streaming('healthcare_dataset.xlsx')
 
 # Display the first 5 rows and a summary of the data
 print("Initial Data Snapshot:")
@@ -14,36 +31,54 @@ print(df.head())
 print("\nDataFrame Info:")
 df.info()
 
-# Create a copy to avoid modifying the original DataFrame
-df_processed = df.copy()
+# Work on the loaded frame directly: the raw snapshot above is never reused,
+# and every step below assigns whole columns, so a full copy only doubles peak memory
+df_processed = df
+del df
 
 # A. Convert 'Date of Admission' and 'Discharge Date' to datetime objects
-df_processed['Date of Admission'] = pd.to_datetime(df_processed['Date of Admission'])
-df_processed['Discharge Date'] = pd.to_datetime(df_processed['Discharge Date'])
+# The Excel reader usually parses them already; otherwise use a fixed format and
+# cache so each distinct date string is parsed only once
+for date_col in ['Date of Admission', 'Discharge Date']:
+    if not pd.api.types.is_datetime64_any_dtype(df_processed[date_col]):
+        df_processed[date_col] = pd.to_datetime(df_processed[date_col], format='%Y-%m-%d', cache=True)
 
 # B. Handle Missing Values
 # Average stay duration for filling missing Discharge Dates
 avg_stay_days = (df_processed['Discharge Date'] - df_processed['Date of Admission']).dt.days.mean()
-df_processed['Discharge Date'].fillna(
-    df_processed['Date of Admission'] + pd.to_timedelta(avg_stay_days, unit='D'),
-    inplace=True
-)
+# Patch only the NaT slots on a plain NumPy copy instead of going through fillna
+discharge = df_processed['Discharge Date'].to_numpy(copy=True)
+missing = np.isnat(discharge)
+if missing.any():
+    admission = df_processed['Date of Admission'].to_numpy()
+    discharge[missing] = admission[missing] + pd.to_timedelta(avg_stay_days, unit='D').to_timedelta64()
+    df_processed['Discharge Date'] = discharge
 
 # Fill missing 'Test Results' with mode
 mode_test_results = df_processed['Test Results'].mode()[0]
-df_processed['Test Results'].fillna(mode_test_results, inplace=True)
+test_results = df_processed['Test Results'].to_numpy(dtype=object, copy=True)
+np.putmask(test_results, pd.isna(test_results), mode_test_results)
+df_processed['Test Results'] = test_results
 
 # C. Clean and Convert 'Billing Amount'
-df_processed['Billing Amount'] = df_processed['Billing Amount'].astype(str)
-df_processed['Billing Amount'] = df_processed['Billing Amount'].str.replace('$', '', regex=False).astype(float)
+# Already numeric when read from Excel; only text values need the '$' stripped,
+# done in one Arrow-backed pass instead of an object-dtype str round-trip
+billing = df_processed['Billing Amount']
+if not pd.api.types.is_numeric_dtype(billing):
+    df_processed['Billing Amount'] = pd.to_numeric(
+        billing.astype('string[pyarrow]').str.removeprefix('$'),
+        errors='coerce'
+    ).astype(float)
 
 # D. Encode Categorical Data
-# One-hot encode 'Test Results'
-df_processed = pd.get_dummies(df_processed, columns=['Test Results'], prefix='Test_Results')
+# One-hot encode 'Test Results' into a single preallocated int8 block
+codes, uniques = pd.factorize(df_processed.pop('Test Results'), sort=True)
+ohe = np.zeros((len(codes), len(uniques)), dtype=np.int8)
+ohe[np.arange(len(codes)), codes] = 1
+df_processed[[f'Test_Results_{u}' for u in uniques]] = ohe
 
-# Label encode 'Gender'
-le = LabelEncoder()
-df_processed['Gender_encoded'] = le.fit_transform(df_processed['Gender'])
+# Label encode 'Gender' (sorted codes, same mapping LabelEncoder gave)
+df_processed['Gender_encoded'] = pd.factorize(df_processed['Gender'], sort=True)[0].astype(np.int8)
 
 # -------------------- Train-Test Split --------------------
 # Example: Suppose target column is 'Billing Amount' (replace with your target)
@@ -62,10 +97,15 @@ print("y_train:", y_train.shape)
 print("y_test:", y_test.shape)
 # ----------------------------------------------------------
 
-# Save preprocessed file
-excel_file = "healthcare_dataset_preprocessed.xlsx"
-df_processed.to_excel(excel_file, index=False, engine="openpyxl")
-print(f"Excel saved as: {excel_file}")
+# Downcast numeric columns before writing (Test_Results_* and Gender_encoded are already int8)
+df_processed['Billing Amount'] = df_processed['Billing Amount'].astype(np.float32)
+for int_col in df_processed.select_dtypes('integer').columns:
+    df_processed[int_col] = pd.to_numeric(df_processed[int_col], downcast='integer')
+
+# Save preprocessed file (Parquet: columnar, compressed and far faster to write than xlsx)
+parquet_file = "healthcare_dataset_preprocessed.parquet"
+df_processed.to_parquet(parquet_file, index=False)
+print(f"Parquet saved as: {parquet_file}")
 
 # Display the first 5 rows and a summary of the preprocessed data
 print("\nProcessed DataFrame Info:")
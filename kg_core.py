@@ -0,0 +1,159 @@
+# Shared core for the Streamlit knowledge-graph apps (semantic_code.py, milestone4_code.py):
+# models are loaded once per server process and every helper is defined in one place
+import streamlit as st
+import pandas as pd
+import spacy
+from spacy.attrs import DEP, POS, HEAD
+from spacy.symbols import VERB
+import numpy as np
+import networkx as nx
+import os
+import hashlib
+from sentence_transformers import SentenceTransformer
+from openpyxl import load_workbook
+import torch
+
+# -----------------------------
+# Model Loading (Safe CPU mode)
+# -----------------------------
+@st.cache_resource
+def load_models():
+    # Lemmas are never read; each call below also disables the components it does not need
+    nlp = spacy.load("en_core_web_sm", exclude=["lemmatizer"])
+    try:
+        # ONNX Runtime backend (sentence-transformers >= 3.2 + optimum[onnxruntime]):
+        # fused attention/LayerNorm kernels on the hub's int8 (AVX2) export
+        model = SentenceTransformer("all-MiniLM-L6-v2", device="cpu", backend="onnx",
+                                    model_kwargs={"file_name": "onnx/model_quint8_avx2.onnx"})
+    except Exception:
+        model = SentenceTransformer("all-MiniLM-L6-v2", device="cpu")
+        # int8 dynamic quantization of the Linear layers: faster CPU encode, ~4x smaller weights,
+        # near-identical cosine rankings
+        model = torch.ao.quantization.quantize_dynamic(model, {torch.nn.Linear}, dtype=torch.qint8)
+    # Inference only: no dropout, no autograd bookkeeping on the weights
+    model.eval()
+    model.requires_grad_(False)
+    return nlp, model
+
+nlp, model = load_models()
+
+# -----------------------------
+# Utility: Upload Loading
+# -----------------------------
+# Only the 'sentence' column is used, so only that column is materialized
+def read_csv_fast(file, column="sentence"):
+    try:
+        # Multithreaded Arrow CSV parser, Arrow-backed string column
+        return pd.read_csv(file, usecols=[column], engine="pyarrow", dtype_backend="pyarrow")
+    except (ImportError, ValueError, KeyError):
+        # No pyarrow, or no such column (pyarrow raises a KeyError): C parser; an empty
+        # frame lets the caller report the missing column
+        file.seek(0)
+        return pd.read_csv(file, usecols=lambda name: name == column)
+
+def read_excel_fast(file, column="sentence"):
+    try:
+        return pd.read_excel(file, engine="calamine", usecols=lambda name: name == column)
+    except (ImportError, ValueError):
+        # No python-calamine: stream rows with openpyxl read-only mode instead of
+        # letting pandas build a Cell object for every value
+        file.seek(0)
+        wb = load_workbook(file, read_only=True, data_only=True)
+        try:
+            rows = wb.active.iter_rows(values_only=True)
+            header = next(rows)
+            if column not in header:
+                return pd.DataFrame(columns=header)
+            idx = header.index(column)
+            return pd.DataFrame({column: [row[idx] for row in rows]})
+        finally:
+            wb.close()
+
+# -----------------------------
+# Step 1: Named Entity Recognition
+# -----------------------------
+def extract_entities(text):
+    doc = nlp(text, disable=["tagger", "attribute_ruler", "parser"])
+    return [(ent.text, ent.label_) for ent in doc.ents]
+
+# -----------------------------
+# Step 2: Relation Extraction
+# -----------------------------
+# Integer label ids, compared in bulk against doc.to_array() instead of reading
+# .dep_/.pos_/.lefts/.rights on every token
+ROOT_DEP = nlp.vocab.strings["ROOT"]
+SUBJECT_DEPS = np.array([nlp.vocab.strings[label] for label in ["nsubj", "nsubjpass"]], dtype=np.uint64)
+OBJECT_DEPS = np.array([nlp.vocab.strings[label] for label in ["dobj", "attr", "dative", "oprd"]], dtype=np.uint64)
+
+def relations_from_doc(doc):
+    attrs = doc.to_array([DEP, POS, HEAD])
+    deps, pos = attrs[:, 0], attrs[:, 1]
+    # HEAD is stored as a (wrapped) offset from the token; turn it into an absolute index
+    positions = np.arange(len(doc))
+    heads = attrs[:, 2].astype(np.int64) + positions
+    is_subject = np.isin(deps, SUBJECT_DEPS)
+    is_object = np.isin(deps, OBJECT_DEPS)
+
+    relations = []
+    for root in np.flatnonzero((deps == ROOT_DEP) & (pos == VERB)):
+        children = heads == root
+        # Left children are before the root, right children after it (root is its own head)
+        subject = np.flatnonzero(children & is_subject & (positions < root))
+        obj = np.flatnonzero(children & is_object & (positions > root))
+        if subject.size and obj.size:
+            relations.append((doc[subject[0]].text, doc[root].text, doc[obj[0]].text))
+    return relations
+
+def extract_relations(text):
+    return relations_from_doc(nlp(text, disable=["ner"]))
+
+# Parse all sentences through nlp.pipe in batches (single process on Windows).
+# Never start more worker processes than there are batches to hand out.
+# Repeated sentences are parsed once; their triples are repeated in input order.
+# Cached on the sentence tuple so widget reruns don't re-parse or restart the worker pool.
+@st.cache_data(show_spinner=False)
+def extract_relations_batch(texts, batch_size=64):
+    unique_texts = list(dict.fromkeys(texts))
+    n_batches = -(-len(unique_texts) // batch_size)
+    n_process = 1 if os.name == "nt" else max(1, min((os.cpu_count() or 1) - 1, n_batches))
+    docs = nlp.pipe(unique_texts, batch_size=batch_size, n_process=n_process, disable=["ner"])
+    relations = {text: relations_from_doc(doc) for text, doc in zip(unique_texts, docs)}
+    return [triple for text in texts for triple in relations[text]]
+
+# -----------------------------
+# Triples Output
+# -----------------------------
+# Streamlit reruns the whole script on every widget change; only rewrite the file
+# when the triples themselves changed
+def save_triples(triples_df, path="triples_output.parquet"):
+    digest = hashlib.sha1(pd.util.hash_pandas_object(triples_df, index=False).values.tobytes()).hexdigest()
+    key = f"saved_digest:{path}"
+    if st.session_state.get(key) != digest:
+        triples_df.to_parquet(path, engine="pyarrow", compression="zstd", index=False)
+        st.session_state[key] = digest
+
+# -----------------------------
+# Embedding Cache (reused across reruns)
+# -----------------------------
+@st.cache_data(show_spinner=False)
+def encode_nodes(nodes):
+    # Normalized so cosine similarity is a plain dot product
+    with torch.inference_mode():
+        return model.encode(list(nodes), batch_size=256, convert_to_tensor=True,
+                            normalize_embeddings=True, show_progress_bar=False)
+
+@st.cache_data(show_spinner=False)
+def encode_query(query):
+    with torch.inference_mode():
+        return model.encode(query, convert_to_tensor=True, normalize_embeddings=True, show_progress_bar=False)
+
+# -----------------------------
+# Graph Building
+# -----------------------------
+# Distinct entities in one hashed C pass; first-appearance order is deterministic for a
+# given triples table, so the tuple is a stable cache key without sorting
+def unique_nodes(triples_df):
+    return tuple(pd.unique(triples_df[["Entity1", "Entity2"]].to_numpy().ravel("K")))
+
+def build_graph(triples_df):
+    return nx.from_pandas_edgelist(triples_df, "Entity1", "Entity2", edge_attr="Relation", create_using=nx.DiGraph)
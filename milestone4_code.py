@@ -1,23 +1,21 @@
 import streamlit as st
 import pandas as pd
-import spacy
 import networkx as nx
 from pyvis.network import Network
 import streamlit.components.v1 as components
-import tempfile
-from sentence_transformers import SentenceTransformer, util
+import re
+import numpy as np
 import torch
 
-# -----------------------------
-# Model Loading (Safe CPU mode)
-# -----------------------------
-@st.cache_resource
-def load_models():
-    nlp = spacy.load("en_core_web_sm")
-    model = SentenceTransformer("all-MiniLM-L6-v2", device="cpu")
-    return nlp, model
+from kg_core import (
+    nlp, read_csv_fast, read_excel_fast, extract_relations_batch, save_triples,
+    encode_nodes, encode_query, unique_nodes, build_graph,
+)
 
-nlp, model = load_models()
+try:
+    import faiss
+except ImportError:
+    faiss = None
 
 # -----------------------------
 # Utility: Normalize Entities
@@ -26,91 +24,121 @@ def normalize(text):
     return text.lower().replace("the ", "").strip()
 
 # -----------------------------
-# Step 1: Named Entity Recognition
-# -----------------------------
-def extract_entities(text):
-    doc = nlp(text)
-    return [(ent.text, ent.label_) for ent in doc.ents]
-
-# -----------------------------
-# Step 2: Relation Extraction
+# Semantic Search (top-k nodes)
 # -----------------------------
-def extract_relations(text):
-    doc = nlp(text)
-    relations = []
-    for token in doc:
-        if token.dep_ == "ROOT" and token.pos_ == "VERB":
-            subject = [w.text for w in token.lefts if w.dep_ in ["nsubj", "nsubjpass"]]
-            obj = [w.text for w in token.rights if w.dep_ in ["dobj", "attr", "dative", "oprd"]]
-            if subject and obj:
-                relations.append((subject[0], token.text, obj[0]))
-    return relations
+# Inner product on normalized vectors == cosine similarity
+@st.cache_resource(show_spinner=False)
+def build_node_index(nodes):
+    node_embeddings = encode_nodes(nodes).cpu().numpy().astype("float32")
+    index = faiss.IndexFlatIP(node_embeddings.shape[1])
+    index.add(node_embeddings)
+    return index
+
+def search_nodes(nodes, query, top_k=5):
+    if not nodes:
+        return []
+    query_embedding = encode_query(query)
+    k = min(top_k, len(nodes))
+    if faiss is not None:
+        scores, ids = build_node_index(nodes).search(query_embedding.cpu().numpy().reshape(1, -1).astype("float32"), k)
+        scores, ids = scores[0], ids[0]
+    else:
+        scores, ids = torch.topk(encode_nodes(nodes) @ query_embedding, k)
+    return [(nodes[i], score) for i, score in zip(ids.tolist(), scores.tolist())]
 
 # -----------------------------
 # Step 3: Domain Linking (Semantic Similarity)
 # -----------------------------
-def link_domains(triples_df, threshold=0.6):
-    # Create full semantic phrases from triples
-    triples_df["sentence"] = triples_df.apply(
-        lambda row: f"{row['Entity1']} {row['Relation']} {row['Entity2']}", axis=1
-    )
-    sentences = triples_df["sentence"].drop_duplicates().tolist()
-
-    if len(sentences) < 2:
+# Below this many entities the dense N x N matmul is small and fast; above it, FAISS
+# range search (when installed) avoids materializing that matrix
+FAISS_MIN_LINK_NODES = 512
+
+# Reuses the node embeddings already cached for Search; cached itself per node set
+@st.cache_data(show_spinner=False)
+def link_domains(nodes, threshold=0.6):
+    if len(nodes) < 2:
         return []
 
-    embeddings = model.encode(sentences, convert_to_tensor=True)
-    linked = []
-
-    for i in range(len(sentences)):
-        for j in range(i + 1, len(sentences)):
-            score = util.pytorch_cos_sim(embeddings[i], embeddings[j]).item()
-            linked.append((sentences[i], sentences[j], round(score, 3)))
+    if faiss is not None and len(nodes) >= FAISS_MIN_LINK_NODES:
+        # Range search on the Search index returns only the pairs above the threshold
+        embeddings = encode_nodes(nodes).cpu().numpy().astype("float32")
+        lims, dists, ids = build_node_index(nodes).range_search(embeddings, threshold)
+        rows = torch.from_numpy(np.repeat(np.arange(len(nodes)), np.diff(lims).astype(np.int64)))
+        cols = torch.from_numpy(ids).long()
+        scores = torch.from_numpy(dists)
+        upper = rows < cols
+        rows, cols, scores = rows[upper], cols[upper], scores[upper]
+    else:
+        # All pairwise cosine scores in one matmul; keep only upper-triangle (i < j) pairs
+        # above the threshold so index tensors scale with the matches, not with N^2
+        embeddings = encode_nodes(nodes)
+        sim = embeddings @ embeddings.T
+        rows, cols = torch.triu(sim > threshold, diagonal=1).nonzero(as_tuple=True)
+        scores = sim[rows, cols]
 
     # Show top 10 links
-    top_links = sorted(linked, key=lambda x: x[2], reverse=True)[:10]
-    return [link for link in top_links if link[2] > threshold]
+    top_scores, top_idx = torch.topk(scores, k=min(10, scores.numel()))
+    return [
+        (nodes[i], nodes[j], round(score, 3))
+        for i, j, score in zip(rows[top_idx].tolist(), cols[top_idx].tolist(), top_scores.tolist())
+    ]
 
 # -----------------------------
 # Step 4: Visualization & Analytics
 # -----------------------------
-def visualize_knowledge_graph(triples_df, highlight_nodes=None):
-    G = nx.DiGraph()
-    for _, row in triples_df.iterrows():
-        G.add_node(row["Entity1"])
-        G.add_node(row["Entity2"])
-        G.add_edge(row["Entity1"], row["Entity2"], label=row["Relation"])
+# Cached on the triples content: typing in the search/question boxes reruns the
+# script but does not recompute centrality or communities
+@st.cache_data(show_spinner=False)
+def compute_analytics(triples_df):
+    G = build_graph(triples_df)
+    if len(G.nodes) == 0:
+        return None
+
+    degree_centrality = nx.degree_centrality(G)
+    analytics = {
+        "top_central_nodes": sorted(degree_centrality.items(), key=lambda x: x[1], reverse=True)[:5],
+        "communities": None,
+        "community_error": None,
+    }
+    try:
+        from networkx.algorithms.community import greedy_modularity_communities
+        analytics["communities"] = [list(community) for community in greedy_modularity_communities(G)]
+    except Exception as e:
+        analytics["community_error"] = str(e)
+    return analytics
+
+# PyVis page built in memory (no temp file) and cached per graph + highlight set
+@st.cache_data(show_spinner=False, max_entries=16)  # one page per highlight set: keep it bounded
+def render_graph_html(triples_df, highlight_nodes=()):
+    G = build_graph(triples_df)
+    net = Network(height="600px", width="100%", directed=True)
+    highlight = set(highlight_nodes)
+    # Per-node add_node: Network.add_nodes int()-casts number-like ids such as "1990"
+    for node in G.nodes:
+        net.add_node(node, label=node, color="red" if node in highlight else None)
+    for entity1, entity2, relation in G.edges(data="Relation"):
+        net.add_edge(entity1, entity2, label=relation, title=relation)
+    return net.generate_html(notebook=False)
 
+def visualize_knowledge_graph(triples_df, highlight_nodes=None):
     st.write("### Graph Analytics")
-    if len(G.nodes) > 0:
-        degree_centrality = nx.degree_centrality(G)
-        top_central_nodes = sorted(degree_centrality.items(), key=lambda x: x[1], reverse=True)[:5]
+    analytics = compute_analytics(triples_df)
+    if analytics:
         st.write("#### Top 5 Central Nodes (by Degree Centrality)")
-        for node, score in top_central_nodes:
+        for node, score in analytics["top_central_nodes"]:
             st.write(f"- **{node}** → {score:.3f}")
 
-        try:
-            from networkx.algorithms.community import greedy_modularity_communities
-            communities = list(greedy_modularity_communities(G))
+        if analytics["communities"] is not None:
+            communities = analytics["communities"]
             st.write(f"#### Detected {len(communities)} Communities:")
             for i, community in enumerate(communities):
-                st.write(f"**Community {i+1}:** {list(community)}")
-        except Exception as e:
-            st.warning(f"Community detection skipped: {e}")
+                st.write(f"**Community {i+1}:** {community}")
+        else:
+            st.warning(f"Community detection skipped: {analytics['community_error']}")
     else:
         st.warning("No nodes available for centrality or community analysis.")
 
-    net = Network(height="600px", width="100%", directed=True)
-    for node in G.nodes:
-        net.add_node(node, label=node, color="red" if highlight_nodes and node in highlight_nodes else None)
-    for edge in G.edges(data=True):
-        net.add_edge(edge[0], edge[1], label=edge[2]["label"])
-    for edge in net.edges:
-        edge["title"] = edge["label"]
-
-    with tempfile.NamedTemporaryFile(delete=False, suffix=".html") as tmp_file:
-        net.write_html(tmp_file.name)
-        components.html(open(tmp_file.name, "r").read(), height=600)
+    components.html(render_graph_html(triples_df, tuple(sorted(highlight_nodes or ()))), height=600)
 
 # -----------------------------
 # Streamlit App
@@ -121,22 +149,24 @@ uploaded_file = st.file_uploader("Upload a CSV or Excel file", type=["csv", "xls
 triples = []
 
 if uploaded_file:
-    df = pd.read_csv(uploaded_file) if uploaded_file.name.endswith(".csv") else pd.read_excel(uploaded_file)
+    df = read_csv_fast(uploaded_file) if uploaded_file.name.endswith(".csv") else read_excel_fast(uploaded_file)
 
     if "sentence" not in df.columns:
         st.error("File must contain a column named 'sentence'")
     else:
         st.info("Using column: **sentence**")
-        for text in df["sentence"].dropna():
-            triples.extend(extract_relations(text))
+        triples = extract_relations_batch(tuple(df["sentence"].dropna().tolist()))
 
         triples_df = pd.DataFrame(triples, columns=["Entity1", "Relation", "Entity2"])
-        triples_df.to_csv("triples_output.csv", index=False)
-        st.success("Triples extracted and saved to triples_output.csv")
+        save_triples(triples_df)
+        st.success("Triples extracted and saved to triples_output.parquet")
 
         st.write("### Extracted Triples")
         st.dataframe(triples_df, use_container_width=True, height=400)
 
+        # Distinct entities, shared by Search and Domain Linking (embedded once per upload)
+        all_nodes = unique_nodes(triples_df)
+
         # -----------------------------
         # Semantic Search
         # -----------------------------
@@ -145,11 +175,7 @@ if uploaded_file:
         highlight_nodes = None
 
         if st.button("Search") and query:
-            all_nodes = list(set(triples_df["Entity1"].tolist() + triples_df["Entity2"].tolist()))
-            node_embeddings = model.encode(all_nodes, convert_to_tensor=True)
-            query_embedding = model.encode(query, convert_to_tensor=True)
-            cosine_scores = util.pytorch_cos_sim(query_embedding, node_embeddings)[0]
-            results = sorted(zip(all_nodes, cosine_scores), key=lambda x: x[1], reverse=True)[:5]
+            results = search_nodes(all_nodes, query, top_k=5)
 
             st.write("### Top Matches:")
             for node, score in results:
@@ -163,24 +189,23 @@ if uploaded_file:
         question = st.text_input("Ask a question (e.g., 'What is the capital of France?')")
 
         if st.button("Get Answer") and question:
-            q_doc = nlp(question)
+            q_doc = nlp(question, disable=["parser"])  # needs only ents and POS tags
             q_ents = [ent.text for ent in q_doc.ents]
             q_tokens = [token.text for token in q_doc if token.pos_ in ["NOUN", "PROPN"]]
 
-            found = []
-            for _, row in triples_df.iterrows():
-                if any(ent.lower() in row["Entity1"].lower() or ent.lower() in row["Entity2"].lower()
-                       for ent in q_ents + q_tokens):
-                    found.append(row)
+            # One case-insensitive regex over both entity columns instead of a per-row scan
+            terms = {term.lower() for term in q_ents + q_tokens}
+            found = triples_df.iloc[0:0]
+            if terms:
+                pattern = "|".join(map(re.escape, terms))
+                mask = (triples_df["Entity1"].str.lower().str.contains(pattern, regex=True)
+                        | triples_df["Entity2"].str.lower().str.contains(pattern, regex=True))
+                found = triples_df.loc[mask, ["Entity1", "Relation", "Entity2"]].drop_duplicates()
 
-            if found:
+            if not found.empty:
                 st.write("### Possible Answers:")
-                seen = set()
-                for _, row in pd.DataFrame(found).iterrows():
-                    sentence = f"{row['Entity1']} {row['Relation']} {row['Entity2']}"
-                    if sentence not in seen:
-                        st.write(f"- **{sentence}**")
-                        seen.add(sentence)
+                for entity1, relation, entity2 in found.itertuples(index=False):
+                    st.write(f"- **{entity1} {relation} {entity2}**")
             else:
                 st.write("No direct match found. Try rephrasing your question.")
 
@@ -188,7 +213,7 @@ if uploaded_file:
         # Domain Linking
         # -----------------------------
         st.write("### Domain Linking (Similar Entities)")
-        domain_links = link_domains(triples_df)
+        domain_links = link_domains(all_nodes)
         if domain_links:
             st.dataframe(pd.DataFrame(domain_links, columns=["Entity1", "Entity2", "Similarity"]))
         else:
@@ -1,65 +1,39 @@
 import streamlit as st
 import pandas as pd
-import spacy
-import networkx as nx
-from pyvis.network import Network
 import streamlit.components.v1 as components
-import tempfile
-from sentence_transformers import SentenceTransformer, util
-
-nlp = spacy.load("en_core_web_sm")
-model = SentenceTransformer("all-MiniLM-L6-v2")
-
-# Step 1: Named Entity Recognition
-def extract_entities(text):
-    doc = nlp(text)
-    entities = [(ent.text, ent.label_) for ent in doc.ents]
-    return entities
-
-# Step 2: Relation Extraction
-def extract_relations(text):
-    doc = nlp(text)
-    relations = []
-    for token in doc:
-        if token.dep_ == "ROOT" and token.pos_ == "VERB":
-            subject = [w.text for w in token.lefts if w.dep_ in ["nsubj", "nsubjpass"]]
-            obj = [w.text for w in token.rights if w.dep_ in ["dobj", "attr", "dative", "oprd"]]
-            if subject and obj:
-                relations.append((subject[0], token.text, obj[0]))
-    return relations
+from pyvis.network import Network
+import torch
 
-# Step 3: Semantic Map Visualization
-def visualize_knowledge_graph(triples_df,  highlight_nodes=None):
-    G = nx.DiGraph()
+# Steps 1-2 (NER, relation extraction) and model loading are shared with milestone4_code.py
+from kg_core import (
+    read_csv_fast, read_excel_fast, extract_relations_batch, save_triples,
+    encode_nodes, encode_query, unique_nodes, build_graph,
+)
 
-    # Add nodes and edges
-    for _, row in triples_df.iterrows():
-        entity1 = row["Entity1"]
-        relation = row["Relation"]
-        entity2 = row["Entity2"]
-        G.add_node(entity1)
-        G.add_node(entity2)
-        G.add_edge(entity1, entity2, label=relation)
+# Step 3: Semantic Map Visualization
+# Rendered to an in-memory HTML string (no temp file) and cached per graph + highlight set
+@st.cache_data(show_spinner=False, max_entries=16)  # one page per highlight set: keep it bounded
+def render_graph_html(triples_df, highlight_nodes=()):
+    # Build the graph straight from the triples columns
+    G = build_graph(triples_df)
 
     # Use PyVis for interactive visualization
     net = Network(height="600px", width="100%", directed=True)
+    highlight = set(highlight_nodes)
     for node in G.nodes:
-        if highlight_nodes and node in highlight_nodes:
+        if node in highlight:
             net.add_node(node, color="red", size=30, label=node)
         else:
             net.add_node(node, label=node)
-    for edge in G.edges(data=True):
-        net.add_edge(edge[0], edge[1], label=edge[2]["label"])
+    # Relation doubles as the edge label and hover title
+    for entity1, entity2, relation in G.edges(data="Relation"):
+        net.add_edge(entity1, entity2, label=relation, title=relation)
+
+    return net.generate_html(notebook=False)
 
-    # Customize edge labels
-    for edge in net.edges:
-        edge["title"] = edge["label"]
+def visualize_knowledge_graph(triples_df,  highlight_nodes=None):
+    components.html(render_graph_html(triples_df, tuple(sorted(highlight_nodes or ()))), height=600)
 
-    # Save and display in Streamlit
-    with tempfile.NamedTemporaryFile(delete=False, suffix=".html") as tmp_file:
-        net.write_html(tmp_file.name)
-        components.html(open(tmp_file.name, "r").read(), height=600)
-    
 
 
 # Streamlit App
@@ -71,10 +45,7 @@ triples = []
 
 if uploaded_file:
     # Detect file type
-    if uploaded_file.name.endswith(".csv"):
-        df = pd.read_csv(uploaded_file)
-    else:
-        df = pd.read_excel(uploaded_file)
+    df = read_csv_fast(uploaded_file) if uploaded_file.name.endswith(".csv") else read_excel_fast(uploaded_file)
 
     # Use the 'sentence' column directly
     if "sentence" not in df.columns:
@@ -82,16 +53,13 @@ if uploaded_file:
     else:
         st.info("Using column: **sentence**")
 
-        # Loop through ALL rows in 'sentence'
-        for text in df["sentence"].dropna():
-            entities = extract_entities(text)
-            relations = extract_relations(text)
-            triples.extend(relations)
+        # Parse ALL rows in 'sentence' in one batched pass
+        triples = extract_relations_batch(tuple(df["sentence"].dropna().tolist()))
 
-        # Save triples to CSV
+        # Save triples to Parquet (dictionary-encoded strings, much smaller than CSV)
         triples_df = pd.DataFrame(triples, columns=["Entity1", "Relation", "Entity2"])
-        triples_df.to_csv("triples_output.csv", index=False)
-        st.success("Triples extracted and saved to triples_output.csv")
+        save_triples(triples_df)
+        st.success("Triples extracted and saved to triples_output.parquet")
 
         # Show ALL triples in scrollable table
         st.write("### Extracted Triples")
@@ -103,12 +71,15 @@ if uploaded_file:
         highlight_nodes = None
 
         if st.button("Search") and query:
-            all_nodes = list(set(triples_df["Entity1"].tolist() + triples_df["Entity2"].tolist()))
-            node_embeddings = model.encode(all_nodes, convert_to_tensor=True)
-            query_embedding = model.encode(query, convert_to_tensor=True)
-            cosine_scores = util.pytorch_cos_sim(query_embedding, node_embeddings)[0]
+            all_nodes = unique_nodes(triples_df)
+            node_embeddings = encode_nodes(all_nodes)
+            query_embedding = encode_query(query)
+            # Both sides are L2-normalized by kg_core, so cosine similarity is a plain matmul
+            cosine_scores = node_embeddings @ query_embedding
             top_k = 5
-            results = sorted(zip(all_nodes, cosine_scores), key=lambda x: x[1], reverse=True)[:top_k]
+            # Partial sort in torch, then one transfer of the k winners to Python
+            top_scores, top_idx = torch.topk(cosine_scores, k=min(top_k, cosine_scores.numel()))
+            results = [(all_nodes[i], score) for i, score in zip(top_idx.tolist(), top_scores.tolist())]
 
             st.write("### Top Matches:")
             for node, score in results: